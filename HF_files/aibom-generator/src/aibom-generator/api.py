@@ -3,19 +3,32 @@ import os
 import json
 import logging
 import sys
+
+# Enable the Rust-based multi-connection transfer path for Hub up/downloads.
+# Must be set before datasets/huggingface_hub are imported; degrades
+# gracefully when the hf_transfer wheel is unavailable.
+try:
+    import hf_transfer  # noqa: F401
+    os.environ.setdefault("HF_HUB_ENABLE_HF_TRANSFER", "1")
+except ImportError:
+    pass
+os.environ.setdefault("HF_XET_HIGH_PERFORMANCE", "1")
+
 from fastapi import FastAPI, HTTPException, Request, Form
 from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
 from datetime import datetime
-from datasets import Dataset, load_dataset, concatenate_datasets
 from typing import Dict, Optional, Any, List
+import atexit
+import threading
+import time
 import uuid
 import re # Import regex module
+from concurrent.futures import ThreadPoolExecutor
 import html # Import html module for escaping
 from urllib.parse import urlparse
-from starlette.middleware.base import BaseHTTPMiddleware
 from huggingface_hub import HfApi
 from huggingface_hub.utils import RepositoryNotFoundError # For specific error handling
 
@@ -58,100 +71,59 @@ app = FastAPI(title="AI SBOM Generator API")
 
 # Try different import paths
 try:
-    from src.aibom_generator.rate_limiting import RateLimitMiddleware, ConcurrencyLimitMiddleware, RequestSizeLimitMiddleware
+    from src.aibom_generator.rate_limiting import ApiGuardMiddleware
     logger.info("Successfully imported rate_limiting from src.aibom_generator")
 except ImportError:
     try:
-        from .rate_limiting import RateLimitMiddleware, ConcurrencyLimitMiddleware, RequestSizeLimitMiddleware
+        from .rate_limiting import ApiGuardMiddleware
         logger.info("Successfully imported rate_limiting with relative import")
     except ImportError:
         try:
-            from rate_limiting import RateLimitMiddleware, ConcurrencyLimitMiddleware, RequestSizeLimitMiddleware
+            from rate_limiting import ApiGuardMiddleware
             logger.info("Successfully imported rate_limiting from current directory")
         except ImportError:
             logger.error("Could not import rate_limiting, DoS protection disabled")
-            # Define dummy middleware classes that just pass through requests
-            class RateLimitMiddleware(BaseHTTPMiddleware):
-                def __init__(self, app, **kwargs):
-                    super().__init__(app)
-                async def dispatch(self, request, call_next):
-                    try:
-                        return await call_next(request)
-                    except Exception as e:
-                        logger.error(f"Error in RateLimitMiddleware: {str(e)}")
-                        return JSONResponse(
-                            status_code=500,
-                            content={"detail": f"Internal server error: {str(e)}"}
-                        )
-                        
-            class ConcurrencyLimitMiddleware(BaseHTTPMiddleware):
+            # Define a dummy pass-through guard (pure ASGI, like the real one)
+            class ApiGuardMiddleware:
                 def __init__(self, app, **kwargs):
-                    super().__init__(app)
-                async def dispatch(self, request, call_next):
-                    try:
-                        return await call_next(request)
-                    except Exception as e:
-                        logger.error(f"Error in ConcurrencyLimitMiddleware: {str(e)}")
-                        return JSONResponse(
-                            status_code=500,
-                            content={"detail": f"Internal server error: {str(e)}"}
-                        )
-                        
-            class RequestSizeLimitMiddleware(BaseHTTPMiddleware):
-                def __init__(self, app, **kwargs):
-                    super().__init__(app)
-                async def dispatch(self, request, call_next):
-                    try:
-                        return await call_next(request)
-                    except Exception as e:
-                        logger.error(f"Error in RequestSizeLimitMiddleware: {str(e)}")
-                        return JSONResponse(
-                            status_code=500,
-                            content={"detail": f"Internal server error: {str(e)}"}
-                        )
+                    self.app = app
+                async def __call__(self, scope, receive, send):
+                    await self.app(scope, receive, send)
 try:
-    from src.aibom_generator.captcha import verify_recaptcha
+    from src.aibom_generator.captcha import verify_recaptcha, close_captcha_client
     logger.info("Successfully imported captcha from src.aibom_generator")
 except ImportError:
     try:
-        from .captcha import verify_recaptcha
+        from .captcha import verify_recaptcha, close_captcha_client
         logger.info("Successfully imported captcha with relative import")
     except ImportError:
         try:
-            from captcha import verify_recaptcha
+            from captcha import verify_recaptcha, close_captcha_client
             logger.info("Successfully imported captcha from current directory")
         except ImportError:
             logger.warning("Could not import captcha module, CAPTCHA verification disabled")
             # Define a dummy verify_recaptcha function that always succeeds
-            def verify_recaptcha(response_token=None):
+            async def verify_recaptcha(response_token=None):
                 logger.warning("Using dummy CAPTCHA verification (always succeeds)")
                 return True
 
+            async def close_captcha_client():
+                pass
+
 
 
-# Rate limiting middleware
+# Fused size -> rate -> concurrency guard (one middleware frame per request)
 app.add_middleware(
-    RateLimitMiddleware,
+    ApiGuardMiddleware,
+    max_content_length=1024*1024,  # 1MB
     rate_limit_per_minute=10,  # Adjust as needed
     rate_limit_window=60,
-    protected_routes=["/generate", "/api/generate", "/api/generate-with-report"]
-)
-
-app.add_middleware(
-    ConcurrencyLimitMiddleware,
     max_concurrent_requests=5,  # Adjust based on server capacity
     timeout=5.0,
     protected_routes=["/generate", "/api/generate", "/api/generate-with-report"]
 )
 
 
-# Size limiting middleware
-app.add_middleware(
-    RequestSizeLimitMiddleware,
-    max_content_length=1024*1024  # 1MB
-)
-
-
 # Define models
 class StatusResponse(BaseModel):
     status: str
@@ -284,6 +256,7 @@ async def cleanup_middleware(request, call_next):
 # Regex for valid Hugging Face ID parts (alphanumeric, -, _, .)
 # Allows owner/model format
 HF_ID_REGEX = re.compile(r"^[a-zA-Z0-9\.\-\_]+/[a-zA-Z0-9\.\-\_]+$")
+HF_NAME_PART_REGEX = re.compile(r"^[a-zA-Z0-9\.\-\_]+$")
 
 def is_valid_hf_input(input_str: str) -> bool:
     """Checks if the input is a valid Hugging Face model ID or URL."""
@@ -299,8 +272,8 @@ def is_valid_hf_input(input_str: str) -> bool:
                 # Must have at least owner/model, can have more like /tree/main
                 if len(path_parts) >= 2 and path_parts[0] and path_parts[1]:
                      # Check characters in the relevant parts
-                     if re.match(r"^[a-zA-Z0-9\.\-\_]+$", path_parts[0]) and \
-                        re.match(r"^[a-zA-Z0-9\.\-\_]+$", path_parts[1]):
+                     if HF_NAME_PART_REGEX.match(path_parts[0]) and \
+                        HF_NAME_PART_REGEX.match(path_parts[1]):
                          return True
             return False # Not a valid HF URL format
         except Exception:
@@ -326,70 +299,240 @@ def _normalise_model_id(raw_id: str) -> str:
 
 
 # --- Add Counter Helper Functions ---
+def _push_log_shard(log_data: Dict[str, list]):
+    """Upload the log rows as a tiny Parquet shard into the dataset's data/ folder.
+
+    Appending an event this way costs a few hundred bytes instead of a full
+    download+re-push of the dataset. Note that load_dataset only merges the
+    shards into the train split while no pushed train-*.parquet files exist;
+    _count_log_rows sums every Parquet file, so counts stay correct in both
+    layouts, and the fallback in _push_log folds shard rows in explicitly.
+    """
+    import io
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    buf = io.BytesIO()
+    pq.write_table(pa.table(log_data), buf)
+    buf.seek(0)
+    HfApi(token=HF_TOKEN).upload_file(
+        path_or_fileobj=buf,
+        path_in_repo=f"data/log-{uuid.uuid4().hex}.parquet",
+        repo_id=HF_REPO,
+        repo_type="dataset",
+    )
+
+
+# Shared executor for fire-and-forget analytics pushes; a fresh thread per
+# event would leak thread objects and pay creation cost on the hot path
+_ANALYTICS_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="sbom-analytics")
+atexit.register(_ANALYTICS_EXECUTOR.shutdown, wait=False)
+
+# In-memory event buffer: flush one shard per batch rather than one Hub
+# round-trip per SBOM generation
+_pending: List[Dict[str, str]] = []
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+_flush_timer: Optional[threading.Timer] = None
+_FLUSH_MAX_ROWS = 64
+_FLUSH_MAX_AGE = 30.0
+
+
 def log_sbom_generation(model_id: str):
     """Logs a successful SBOM generation event to the Hugging Face dataset."""
+    global _flush_timer
     if not HF_TOKEN:
         logger.warning("HF_TOKEN not set. Skipping SBOM generation logging.")
         return
 
+    # Normalize model_id before logging
+    normalized_model_id_for_log = _normalise_model_id(model_id) # added to normalize id
+    row = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "event": "generated",
+        "model_id": normalized_model_id_for_log # use normalized_model_id_for_log
+    }
+    with _pending_lock:
+        _pending.append(row)
+        should_flush = (
+            len(_pending) >= _FLUSH_MAX_ROWS
+            or time.monotonic() - _last_flush > _FLUSH_MAX_AGE
+        )
+        if not should_flush and _flush_timer is None:
+            # Schedule a delayed flush so buffered rows drain on time even
+            # if no further traffic arrives to trigger the checks above
+            _flush_timer = threading.Timer(_FLUSH_MAX_AGE, _flush_pending)
+            _flush_timer.daemon = True
+            _flush_timer.start()
+    if should_flush:
+        # Fire-and-forget: the Hub round-trip happens off the request thread
+        _ANALYTICS_EXECUTOR.submit(_flush_pending)
+
+
+def _flush_pending():
+    """Drain buffered log events and push them as one batch."""
+    global _last_flush, _flush_timer
+    with _pending_lock:
+        if _flush_timer is not None:
+            _flush_timer.cancel()
+            _flush_timer = None
+        rows = _pending[:]
+        _pending.clear()
+        _last_flush = time.monotonic()
+    if not rows:
+        return
+    log_data = {
+        "timestamp": [r["timestamp"] for r in rows],
+        "event": [r["event"] for r in rows],
+        "model_id": [r["model_id"] for r in rows],
+    }
+    _push_log(log_data)
+
+
+# Registered after the executor's shutdown hook so it runs first (atexit is
+# LIFO) and flushes in-flight events synchronously on shutdown
+atexit.register(_flush_pending)
+
+
+def _push_log(log_data: Dict[str, list]):
+    """Push one batch of log rows to the Hub (runs on the analytics executor)."""
+    normalized_model_id_for_log = log_data["model_id"][0]
+
+    # Preferred path: append-only shard upload, O(1) in dataset size
     try:
-        # Normalize model_id before logging
-        normalized_model_id_for_log = _normalise_model_id(model_id) # added to normalize id
-        log_data = {
-            "timestamp": [datetime.utcnow().isoformat()],
-            "event": ["generated"],
-            "model_id": [normalized_model_id_for_log] # use normalized_model_id_for_log
-        }
+        _push_log_shard(log_data)
+        logger.info(f"Successfully logged {len(log_data['model_id'])} SBOM generation event(s) to {HF_REPO}")
+        return
+    except Exception as shard_err:
+        logger.warning(f"Parquet shard upload to {HF_REPO} failed ({shard_err}). Falling back to full dataset push.")
+
+    try:
+        # datasets is only needed on this legacy fallback path; importing it
+        # lazily keeps its heavy dependency graph off worker startup
+        from datasets import Dataset, load_dataset, concatenate_datasets
+
         ds_new_log = Dataset.from_dict(log_data)
+        api = HfApi(token=HF_TOKEN)
+        folded_shards: List[str] = []
 
         # Try to load existing dataset to append
         try:
+            repo_files = api.list_repo_files(HF_REPO, repo_type="dataset")
+            shard_files = [
+                f for f in repo_files
+                if f.startswith("data/log-") and f.endswith(".parquet")
+            ]
+            # load_dataset only merges the log shards into the train split
+            # while no pushed train-*.parquet files exist; once a train split
+            # has been pushed the shards are ignored and their rows must be
+            # folded in explicitly before the shard files can be deleted
+            has_train_split = any(
+                f.endswith(".parquet") and not f.startswith("data/log-")
+                for f in repo_files
+            )
             # Use trust_remote_code=True if required by the dataset/model on HF
             # Corrected: Removed unnecessary backslashes around 'train'
             existing_ds = load_dataset(HF_REPO, token=HF_TOKEN, split='train', trust_remote_code=True)
+            pieces = []
             # Check if dataset is empty or has different columns (handle initial creation)
             if len(existing_ds) > 0 and set(existing_ds.column_names) == set(log_data.keys()):
-                 ds_to_push = concatenate_datasets([existing_ds, ds_new_log])
+                 pieces.append(existing_ds)
             elif len(existing_ds) == 0:
                  logger.info(f"Dataset {HF_REPO} is empty. Pushing initial data.")
-                 ds_to_push = ds_new_log
             else:
                  logger.warning(f"Dataset {HF_REPO} has unexpected columns {existing_ds.column_names} vs {list(log_data.keys())}. Appending new log anyway, structure might differ.")
                  # Attempt concatenation even if columns differ slightly, HF might handle it
                  # Or consider more robust schema migration/handling if needed
-                 ds_to_push = concatenate_datasets([existing_ds, ds_new_log])
+                 pieces.append(existing_ds)
+
+            if shard_files and has_train_split:
+                from huggingface_hub import hf_hub_download
+
+                shard_paths = [
+                    hf_hub_download(HF_REPO, name, repo_type="dataset", token=HF_TOKEN)
+                    for name in shard_files
+                ]
+                pieces.append(Dataset.from_parquet(shard_paths))
+            # Every shard row is now in pieces (read by load_dataset when no
+            # train split exists, read explicitly above otherwise), so the
+            # shard files are safe to delete after a successful push
+            folded_shards = shard_files
+            pieces.append(ds_new_log)
+            ds_to_push = concatenate_datasets(pieces) if len(pieces) > 1 else ds_new_log
 
         except Exception as load_err:
              # Handle case where dataset doesn't exist yet or other loading errors
              # Corrected: Removed unnecessary backslash in doesn't
              logger.info(f"Could not load existing dataset {HF_REPO} (may not exist yet): {load_err}. Pushing new dataset.")
              ds_to_push = ds_new_log # ds is already prepared with the new log entry
+             # Nothing was folded in, so the shards must stay
+             folded_shards = []
 
         # Push the updated or new dataset
         # Corrected: Removed unnecessary backslash in it's
         ds_to_push.push_to_hub(HF_REPO, token=HF_TOKEN, private=True) # Ensure it's private
         logger.info(f"Successfully logged SBOM generation for {normalized_model_id_for_log} to {HF_REPO}") # use normalized model id
 
+        # The pushed train split now contains the shard rows; drop the shards
+        # so they aren't counted (or folded) a second time
+        for shard in folded_shards:
+            try:
+                api.delete_file(shard, repo_id=HF_REPO, repo_type="dataset")
+            except Exception as del_err:
+                logger.warning(f"Could not delete folded log shard {shard} from {HF_REPO}: {del_err}")
+
     except Exception as e:
         logger.error(f"Failed to log SBOM generation to {HF_REPO}: {e}")
 
+def _count_log_rows() -> int:
+    """Sum row counts from the log repo's Parquet footers without materializing rows."""
+    import pyarrow.parquet as pq
+    from huggingface_hub import hf_hub_download
+
+    api = HfApi(token=HF_TOKEN)
+    shard_names = [
+        f for f in api.list_repo_files(HF_REPO, repo_type="dataset")
+        if f.endswith(".parquet")
+    ]
+    if not shard_names:
+        # Dataset not stored as Parquet (e.g. legacy layout) - fall back to loading it
+        from datasets import load_dataset
+
+        ds = load_dataset(HF_REPO, token=HF_TOKEN, split='train', trust_remote_code=True)
+        return len(ds)
+
+    count = 0
+    for name in shard_names:
+        path = hf_hub_download(HF_REPO, name, repo_type="dataset", token=HF_TOKEN)
+        count += pq.ParquetFile(path).metadata.num_rows
+    return count
+
+
+# Short-TTL cache so repeated count queries (every page render) hit memory
+# rather than the Hub
+_count_cache = {"value": None, "ts": 0.0}
+_COUNT_CACHE_TTL = 60.0
+
+
 def get_sbom_count() -> str:
     """Retrieves the total count of generated SBOMs from the Hugging Face dataset."""
     if not HF_TOKEN:
         logger.warning("HF_TOKEN not set. Cannot retrieve SBOM count.")
         return "N/A"
+    if _count_cache["value"] is not None and time.time() - _count_cache["ts"] < _COUNT_CACHE_TTL:
+        return _count_cache["value"]
     try:
-        # Load the dataset - assumes 'train' split exists after first push
-        # Use trust_remote_code=True if required by the dataset/model on HF
-        # Corrected: Removed unnecessary backslashes around 'train'
-        ds = load_dataset(HF_REPO, token=HF_TOKEN, split='train', trust_remote_code=True)
-        count = len(ds)
+        count = _count_log_rows()
         logger.info(f"Retrieved SBOM count: {count} from {HF_REPO}")
         # Format count for display (e.g., add commas for large numbers)
-        return f"{count:,}"
+        _count_cache["value"] = f"{count:,}"
+        _count_cache["ts"] = time.time()
+        return _count_cache["value"]
     except Exception as e:
         logger.error(f"Failed to retrieve SBOM count from {HF_REPO}: {e}")
-        # Return "N/A" or similar indicator on error
+        # Serve the stale value if we have one; otherwise indicate no data
+        if _count_cache["value"] is not None:
+            return _count_cache["value"]
         return "N/A"
 # --- End Counter Helper Functions ---
 
@@ -398,6 +541,15 @@ async def startup_event():
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     logger.info(f"Output directory ready at {OUTPUT_DIR}")
     logger.info(f"Registered routes: {[route.path for route in app.routes]}")
+    # Warm the SBOM-count cache in the background so the first page render
+    # doesn't wait on the Hub round-trip; errors are already handled inside
+    # get_sbom_count (stale value / "N/A").
+    if HF_TOKEN:
+        threading.Thread(target=get_sbom_count, daemon=True).start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await close_captcha_client()
 
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request):
@@ -573,7 +725,7 @@ async def generate_form(
     logger.info(f"All form data: {dict(form_data)}")
     
     # Verify CAPTCHA
-    if not verify_recaptcha(g_recaptcha_response):
+    if not await verify_recaptcha(g_recaptcha_response):
         return templates.TemplateResponse(
             "error.html", {
                 "request": request, 
@@ -652,8 +804,8 @@ async def generate_form(
         filename = f"{normalized_model_id.replace('/', '_')}_ai_sbom.json"
         filepath = os.path.join(OUTPUT_DIR, filename)
 
-        with open(filepath, "w") as f:
-            json.dump(aibom, f, indent=2)
+        with open(filepath, "wb") as f:
+            f.write(generator.to_json(aibom))
 
         # --- Log Generation Event ---
         log_sbom_generation(sanitized_model_id) # Use sanitized ID
@@ -905,8 +1057,8 @@ async def api_generate_aibom(request: GenerateRequest):
             # Save AIBOM to file
             filename = f"{normalized_model_id.replace('/', '_')}_ai_sbom.json"
             filepath = os.path.join(OUTPUT_DIR, filename)
-            with open(filepath, "w") as f:
-                json.dump(aibom, f, indent=2)
+            with open(filepath, "wb") as f:
+                f.write(generator.to_json(aibom))
             
             # Log generation
             log_sbom_generation(sanitized_model_id)
@@ -1012,8 +1164,8 @@ async def api_generate_with_report(request: GenerateRequest):
             # Save AIBOM to file
             filename = f"{normalized_model_id.replace('/', '_')}_ai_sbom.json"
             filepath = os.path.join(OUTPUT_DIR, filename)
-            with open(filepath, "w") as f:
-                json.dump(aibom, f, indent=2)
+            with open(filepath, "wb") as f:
+                f.write(generator.to_json(aibom))
             
             # Log generation
             log_sbom_generation(sanitized_model_id)
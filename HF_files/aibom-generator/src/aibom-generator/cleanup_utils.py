@@ -1,9 +1,17 @@
+import heapq
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+# Shared pool for concurrent per-directory cleanup; scanning and unlinking
+# are I/O-bound, so threads overlap the syscall waits
+_CLEANUP_EXECUTOR = ThreadPoolExecutor(
+    max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="cleanup"
+)
+
 def cleanup_old_files(directory, max_age_days=7):
     """Remove files older than max_age_days from the specified directory."""
     if not os.path.exists(directory):
@@ -11,21 +19,20 @@ def cleanup_old_files(directory, max_age_days=7):
         return 0
     
     removed_count = 0
-    now = datetime.now()
-    
+    # Compare raw POSIX timestamps; no datetime object per file
+    cutoff_ts = (datetime.now() - timedelta(days=max_age_days)).timestamp()
+
     try:
-        for filename in os.listdir(directory):
-            file_path = os.path.join(directory, filename)
-            if os.path.isfile(file_path):
-                file_age = now - datetime.fromtimestamp(os.path.getmtime(file_path))
-                if file_age.days > max_age_days:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.stat().st_mtime < cutoff_ts:
                     try:
-                        os.remove(file_path)
+                        os.remove(entry.path)
                         removed_count += 1
-                        logger.info(f"Removed old file: {file_path}")
+                        logger.info(f"Removed old file: {entry.path}")
                     except Exception as e:
-                        logger.error(f"Error removing file {file_path}: {e}")
-        
+                        logger.error(f"Error removing file {entry.path}: {e}")
+
         logger.info(f"Cleanup completed: removed {removed_count} files older than {max_age_days} days from {directory}")
         return removed_count
     except Exception as e:
@@ -39,36 +46,94 @@ def limit_file_count(directory, max_files=1000):
         return 0
     
     removed_count = 0
-    
+
     try:
-        files = []
-        for filename in os.listdir(directory):
-            file_path = os.path.join(directory, filename)
-            if os.path.isfile(file_path):
-                files.append((file_path, os.path.getmtime(file_path)))
-        
-        # Sort by modification time (oldest first)
-        files.sort(key=lambda x: x[1])
-        
-        # Remove oldest files if we exceed the limit
-        files_to_remove = files[:-max_files] if len(files) > max_files else []
-        
-        for file_path, _ in files_to_remove:
+        # Cheap first pass: bail out without stat'ing anything if under limit
+        count = 0
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    count += 1
+        if count <= max_files:
+            logger.info(f"File count limit enforced: removed 0 oldest files from {directory}, keeping max {max_files}")
+            return 0
+
+        # Only the oldest (count - max_files) entries are needed, so use a
+        # bounded heap selection instead of sorting the full listing
+        files_to_remove = heapq.nsmallest(
+            count - max_files,
+            ((e.stat().st_mtime, e.path) for e in os.scandir(directory) if e.is_file())
+        )
+
+        for _, file_path in files_to_remove:
             try:
-                os.remove(file_path)
+                os.unlink(file_path)
                 removed_count += 1
                 logger.info(f"Removed excess file: {file_path}")
             except Exception as e:
                 logger.error(f"Error removing file {file_path}: {e}")
-        
+
         logger.info(f"File count limit enforced: removed {removed_count} oldest files from {directory}, keeping max {max_files}")
         return removed_count
     except Exception as e:
         logger.error(f"Error during file count limiting in directory {directory}: {e}")
         return 0
 
+def _scan_once(directory):
+    """Single scandir pass returning (mtime, path) tuples for regular files."""
+    with os.scandir(directory) as entries:
+        return [(e.stat().st_mtime, e.path) for e in entries if e.is_file()]
+
 def perform_cleanup(directory, max_age_days=7, max_files=1000):
-    """Perform both time-based and count-based cleanup."""
-    time_removed = cleanup_old_files(directory, max_age_days)
-    count_removed = limit_file_count(directory, max_files)
-    return time_removed + count_removed
+    """Perform both time-based and count-based cleanup in one directory scan."""
+    if not os.path.exists(directory):
+        logger.warning(f"Directory does not exist: {directory}")
+        return 0
+
+    try:
+        entries = _scan_once(directory)
+    except Exception as e:
+        logger.error(f"Error during cleanup of directory {directory}: {e}")
+        return 0
+
+    cutoff_ts = (datetime.now() - timedelta(days=max_age_days)).timestamp()
+    removed_count = 0
+    survivors = []
+    for mtime, file_path in entries:
+        if mtime < cutoff_ts:
+            try:
+                os.unlink(file_path)
+                removed_count += 1
+                logger.info(f"Removed old file: {file_path}")
+            except Exception as e:
+                logger.error(f"Error removing file {file_path}: {e}")
+        else:
+            survivors.append((mtime, file_path))
+
+    # Among the survivors, trim the oldest entries past the count limit
+    excess = len(survivors) - max_files
+    if excess > 0:
+        for _, file_path in heapq.nsmallest(excess, survivors):
+            try:
+                os.unlink(file_path)
+                removed_count += 1
+                logger.info(f"Removed excess file: {file_path}")
+            except Exception as e:
+                logger.error(f"Error removing file {file_path}: {e}")
+
+    logger.info(f"Cleanup completed: removed {removed_count} files from {directory} (max_age_days={max_age_days}, max_files={max_files})")
+    return removed_count
+
+def perform_cleanup_many(directories):
+    """Run perform_cleanup for several directories concurrently.
+
+    Accepts an iterable of directory paths or (directory, max_age_days,
+    max_files) tuples; returns the total number of files removed.
+    """
+    futures = []
+    for spec in directories:
+        if isinstance(spec, (tuple, list)):
+            futures.append(_CLEANUP_EXECUTOR.submit(perform_cleanup, *spec))
+        else:
+            futures.append(_CLEANUP_EXECUTOR.submit(perform_cleanup, spec))
+    return sum(future.result() for future in as_completed(futures))
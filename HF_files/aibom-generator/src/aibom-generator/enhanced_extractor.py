@@ -19,6 +19,7 @@ import json
 import logging
 import re
 import requests
+from functools import lru_cache
 from typing import Dict, Any, Optional, List, Tuple
 from enum import Enum
 from dataclasses import dataclass, field
@@ -45,6 +46,30 @@ except ImportError:
 # Configure logging for this module
 logger = logging.getLogger(__name__)
 
+# Per-process caches so repeat extractions of popular models skip the Hub
+# round-trip and re-parse; failures raise and are therefore never cached
+@lru_cache(maxsize=256)
+def _fetch_config_cached(model_id: str, filename: str) -> Dict[str, Any]:
+    file_path = hf_hub_download(repo_id=model_id, filename=filename)
+    with open(file_path, 'r') as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=256)
+def _fetch_readme_cached(model_id: str) -> str:
+    readme_path = hf_hub_download(repo_id=model_id, filename="README.md")
+    with open(readme_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+# Performance-metric patterns, compiled once at import rather than per call
+_METRIC_PATTERNS = [
+    ("accuracy", re.compile(r'accuracy[:\s]+([0-9\.]+)', re.IGNORECASE)),
+    ("f1", re.compile(r'f1[:\s]+([0-9\.]+)', re.IGNORECASE)),
+    ("bleu", re.compile(r'bleu[:\s]+([0-9\.]+)', re.IGNORECASE)),
+    ("rouge", re.compile(r'rouge[:\s]+([0-9\.]+)', re.IGNORECASE)),
+]
+
 class DataSource(Enum):
     """Enumeration of data sources for provenance tracking"""
     HF_API = "huggingface_api"
@@ -196,6 +221,13 @@ class EnhancedExtractor:
         "gplv2": "GPL-2.0-only",
     }
 
+    # Single alternation regex so the snippet is scanned once instead of
+    # once per mapping entry; longer phrases first so e.g. "apache license
+    # version 2.0" wins over "apache 2.0" at the same position
+    _LICENSE_HEADER_RE = re.compile(
+        "|".join(re.escape(h) for h in sorted(LICENSE_MAPPINGS, key=len, reverse=True))
+    )
+
     def _detect_license_from_file(self, model_id: str) -> Optional[str]:
         """
         Attempt to detect a licence by looking at repository files.
@@ -209,9 +241,9 @@ class EnhancedExtractor:
                 file_path = hf_hub_download(repo_id=model_id, filename=filename)
                 with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
                     snippet = f.read(4096).lower()
-                for header, spdx_id in self.LICENSE_MAPPINGS.items():
-                    if header in snippet:
-                        return spdx_id
+                match = self._LICENSE_HEADER_RE.search(snippet)
+                if match:
+                    return self.LICENSE_MAPPINGS[match.group(0)]
             except (RepositoryNotFoundError, EntryNotFoundError):
                 # file doesn’t exist; continue
                 continue
@@ -771,26 +803,22 @@ class EnhancedExtractor:
     def _download_and_parse_config(self, model_id: str, filename: str) -> Optional[Dict[str, Any]]:
         """Download and parse a configuration file from the model repository"""
         try:
-            file_path = hf_hub_download(repo_id=model_id, filename=filename)
-            with open(file_path, 'r') as f:
-                return json.load(f)
+            return _fetch_config_cached(model_id, filename)
         except (RepositoryNotFoundError, EntryNotFoundError, json.JSONDecodeError) as e:
             logger.debug(f"Could not download/parse {filename}: {e}")
             return None
         except Exception as e:
             logger.warning(f"Unexpected error downloading {filename}: {e}")
             return None
-    
+
     def _get_readme_content(self, model_card: Optional[ModelCard], model_id: str) -> Optional[str]:
         """Get README content from model card or by downloading"""
         try:
             if model_card and hasattr(model_card, 'content'):
                 return model_card.content
-            
-            readme_path = hf_hub_download(repo_id=model_id, filename="README.md")
-            with open(readme_path, 'r', encoding='utf-8') as f:
-                return f.read()
-                
+
+            return _fetch_readme_cached(model_id)
+
         except Exception as e:
             logger.debug(f"Could not get README content: {e}")
             return None
@@ -827,19 +855,10 @@ class EnhancedExtractor:
     def _extract_metrics(self, text: str) -> Dict[str, float]:
         """Extract performance metrics from text"""
         metrics = {}
-        
-        metric_patterns = [
-            r'accuracy[:\s]+([0-9\.]+)',
-            r'f1[:\s]+([0-9\.]+)',
-            r'bleu[:\s]+([0-9\.]+)',
-            r'rouge[:\s]+([0-9\.]+)',
-        ]
-        
-        for pattern_str in metric_patterns:
-            pattern = re.compile(pattern_str, re.IGNORECASE)
+
+        for metric_name, pattern in _METRIC_PATTERNS:
             matches = pattern.findall(text)
             if matches:
-                metric_name = pattern_str.split('[')[0]
                 try:
                     metrics[metric_name] = float(matches[0])
                 except ValueError:
@@ -9,6 +9,13 @@ import re
 from typing import Dict, Any, Optional, List, Tuple
 from functools import lru_cache
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
 class FieldRegistryManager:
     """
     Field registry manager that handles:
@@ -43,8 +50,14 @@ class FieldRegistryManager:
     def _load_registry(self) -> Dict[str, Any]:
         """Load the complete field registry from JSON file"""
         try:
-            with open(self.registry_path, 'r', encoding='utf-8') as f:
-                registry = json.load(f)
+            if ORJSON_AVAILABLE:
+                # orjson parses the ~100 KB registry several times faster
+                # than stdlib json and allocates fewer intermediates
+                with open(self.registry_path, 'rb') as f:
+                    registry = orjson.loads(f.read())
+            else:
+                with open(self.registry_path, 'r', encoding='utf-8') as f:
+                    registry = json.load(f)
             
             # Validate basic structure
             required_sections = ["fields"]
@@ -1,13 +1,92 @@
 import json
+import os
+import threading
 import uuid
 import datetime
 import json
+from functools import lru_cache
 from typing import Dict, Optional, Any, List
 
 from huggingface_hub import HfApi, ModelCard
 from huggingface_hub.repocard_data import EvalResult
 from urllib.parse import urlparse
-from .utils import calculate_completeness_score
+from .utils import calculate_completeness_score, validate_aibom
+
+# The generator's own tool entry is identical in every AIBOM; build it once
+# and shallow-copy per document (nothing mutates the nested manufacturer dict)
+_TOOLS_COMPONENT_TEMPLATE: Dict[str, Any] = {
+    "bom-ref": "pkg:generic/owasp-genai/owasp-aibom-generator@1.0.0",
+    "type": "application",
+    "name": "OWASP AIBOM Generator",
+    "version": "1.0.0",
+    "manufacturer": {
+        "name": "OWASP GenAI Security Project"
+    }
+}
+
+# Technical metadata fields copied verbatim into component properties
+_TECH_PROP_FIELDS = ("model_type", "tokenizer_class", "architectures", "library_name")
+
+# Component-level fields that shouldn't be duplicated in model card properties
+_MODEL_CARD_COMPONENT_FIELDS = frozenset({"name", "author", "license", "description", "commit"})
+
+# Keys that trigger the optional technical-details / considerations subsections
+_TECH_DETAIL_KEYS = frozenset({"model_type", "tokenizer_class", "architectures"})
+_CONSIDERATION_KEYS = ("limitations", "ethical_considerations", "bias", "risks")
+
+
+# SPDX id (lowercased) -> canonical license URL, built once at import
+_LICENSE_URLS = {
+    "apache-2.0": "https://www.apache.org/licenses/LICENSE-2.0",
+    "mit": "https://opensource.org/licenses/MIT",
+    "bsd-3-clause": "https://opensource.org/licenses/BSD-3-Clause",
+    "gpl-3.0": "https://www.gnu.org/licenses/gpl-3.0.en.html",
+    "cc-by-4.0": "https://creativecommons.org/licenses/by/4.0/",
+    "cc-by-sa-4.0": "https://creativecommons.org/licenses/by-sa/4.0/",
+    "cc-by-nc-4.0": "https://creativecommons.org/licenses/by-nc/4.0/",
+    "cc-by-nd-4.0": "https://creativecommons.org/licenses/by-nd/4.0/",
+    "cc-by-nc-sa-4.0": "https://creativecommons.org/licenses/by-nc-sa/4.0/",
+    "cc-by-nc-nd-4.0": "https://creativecommons.org/licenses/by-nc-nd/4.0/",
+    "lgpl-3.0": "https://www.gnu.org/licenses/lgpl-3.0.en.html",
+    "mpl-2.0": "https://www.mozilla.org/en-US/MPL/2.0/",
+}
+
+
+@lru_cache(maxsize=256)
+def _purl_model_id(model_id: str) -> str:
+    """Escape a Hugging Face model id for use in a pkg:generic PURL."""
+    return model_id.replace("/", "%2F")
+
+# Buffered randomness for serialNumbers: one os.urandom syscall per 256 UUIDs
+# instead of one per AIBOM. serialNumber needs uniqueness, not unpredictability.
+_SERIAL_BUF_SIZE = 4096
+_serial_buf = b""
+_serial_pos = 0
+# Serialize buffer access: two threads racing the slice/advance could
+# otherwise emit identical serialNumbers
+_serial_lock = threading.Lock()
+
+
+def _new_serial() -> str:
+    """Return a random version-4 UUID string from a buffered entropy pool."""
+    global _serial_buf, _serial_pos
+    with _serial_lock:
+        if _serial_pos + 16 > len(_serial_buf):
+            _serial_buf = os.urandom(_SERIAL_BUF_SIZE)
+            _serial_pos = 0
+        raw = _serial_buf[_serial_pos:_serial_pos + 16]
+        _serial_pos += 16
+    return str(uuid.UUID(bytes=raw, version=4))
+
+
+# Optional fast JSON serialization (orjson emits bytes and is several times
+# faster than the stdlib json module on deeply nested AIBOM dicts)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
 
 # Import registry-aware enhanced extraction if available
 try:
@@ -59,6 +138,18 @@ class AIBOMGenerator:
         """Return the enhanced extraction results from the last extraction"""
         return getattr(self, 'extraction_results', {})
 
+    @staticmethod
+    def to_json(aibom: Dict[str, Any]) -> bytes:
+        """Serialize an AIBOM dict to indented JSON bytes, preferring orjson."""
+        if ORJSON_AVAILABLE:
+            return orjson.dumps(aibom, option=orjson.OPT_INDENT_2)
+        return json.dumps(aibom, indent=2).encode("utf-8")
+
+    @staticmethod
+    def to_json_str(aibom: Dict[str, Any]) -> str:
+        """Serialize an AIBOM dict to an indented JSON string."""
+        return AIBOMGenerator.to_json(aibom).decode("utf-8")
+
     def _setup_enhanced_logging(self):
         """Setup enhanced logging for extraction tracking"""
         import logging
@@ -145,28 +236,34 @@ class AIBOMGenerator:
                     print("❌ POOR: Significant field loss detected")
 
             
+            # Validate once up front; the scorer reuses this result instead of
+            # re-walking the AIBOM on every calculate_completeness_score call
+            validation_result = validate_aibom(original_aibom)
+
             # Calculate initial score with industry-neutral approach if enabled
-            original_score = calculate_completeness_score(original_aibom, validate=True, use_best_practices=use_best_practices, extraction_results=self.extraction_results)
+            original_score = calculate_completeness_score(original_aibom, validate=True, use_best_practices=use_best_practices, extraction_results=self.extraction_results, validation_result=validation_result)
 
             
-            # Final metadata starts with original metadata
-            final_metadata = original_metadata.copy() if original_metadata else {}
-            
+            # Final metadata starts as the original metadata; it is only copied
+            # when AI enhancement actually produces something to merge
+            final_metadata = original_metadata
+
             # Apply AI enhancement if requested
             ai_enhanced = False
             ai_model_name = None
-            
+
             if use_inference and self.inference_model_url:
                 try:
                     # Extract additional metadata using AI
                     enhanced_metadata = self._extract_unstructured_metadata(model_card, model_id)
-                    
+
                     # If we got enhanced metadata, merge it with original
                     if enhanced_metadata:
                         ai_enhanced = True
                         ai_model_name = "BERT-base-uncased"  # Will be replaced with actual model name
-                        
+
                         # Merge enhanced metadata with original (enhanced takes precedence)
+                        final_metadata = original_metadata.copy() if original_metadata else {}
                         for key, value in enhanced_metadata.items():
                             if value is not None and (key not in final_metadata or not final_metadata[key]):
                                 final_metadata[key] = value
@@ -175,22 +272,34 @@ class AIBOMGenerator:
                     # Continue with original metadata if enhancement fails
                     print("🚨 FALLBACK: Using _create_minimal_aibom due to error!")
                     print(f"🚨 ERROR DETAILS: {str(e)}")
-            # Create final AIBOM with potentially enhanced metadata
-            aibom = self._create_aibom_structure(model_id, final_metadata)
+            if ai_enhanced:
+                # Create final AIBOM with the enhanced metadata
+                aibom = self._create_aibom_structure(model_id, final_metadata)
+            else:
+                # No enhancement happened: the original AIBOM is already the
+                # final one, so skip the second build and just refresh the id
+                aibom = original_aibom
+                aibom["serialNumber"] = f"urn:uuid:{_new_serial()}"
             
+            # Re-validate only if AI enhancement actually changed the metadata;
+            # otherwise the structure is identical modulo the serialNumber
+            if ai_enhanced:
+                validation_result = validate_aibom(aibom)
+
             # Calculate final score with enhanced extraction results
             extraction_results = self.get_extraction_results()
             final_score = calculate_completeness_score(
-                aibom, 
-                validate=True, 
+                aibom,
+                validate=True,
                 use_best_practices=use_best_practices,
-                extraction_results=extraction_results  # Pass enhanced results
+                extraction_results=extraction_results,  # Pass enhanced results
+                validation_result=validation_result
             )
             
 
             if output_file:
-                with open(output_file, 'w') as f:
-                    json.dump(aibom, f, indent=2)
+                with open(output_file, 'wb') as f:
+                    f.write(self.to_json(aibom))
 
             # Create enhancement report for UI display and store as instance variable
             self.enhancement_report = {
@@ -213,41 +322,33 @@ class AIBOMGenerator:
         return {
             "bomFormat": "CycloneDX",
             "specVersion": "1.6",
-            "serialNumber": f"urn:uuid:{str(uuid.uuid4())}",
+            "serialNumber": f"urn:uuid:{_new_serial()}",
             "version": 1,
             "metadata": {
                 "timestamp": datetime.datetime.utcnow().isoformat() + "Z",
                 "tools": {
-                    "components": [{
-                        "bom-ref": "pkg:generic/owasp-genai/owasp-aibom-generator@1.0.0",
-                        "type": "application",
-                        "name": "OWASP AIBOM Generator",
-                        "version": "1.0.0",
-                        "manufacturer": {
-                            "name": "OWASP GenAI Security Project"
-                        }
-                    }]
+                    "components": [_TOOLS_COMPONENT_TEMPLATE.copy()]
                 },
                 "component": {
-                    "bom-ref": f"pkg:generic/{model_id.replace('/', '%2F')}@1.0",
+                    "bom-ref": f"pkg:generic/{_purl_model_id(model_id)}@1.0",
                     "type": "application",
                     "name": model_id.split("/")[-1],
                     "description": f"AI model {model_id}",
                     "version": "1.0",
-                    "purl": f"pkg:generic/{model_id.replace('/', '%2F')}@1.0",
+                    "purl": f"pkg:generic/{_purl_model_id(model_id)}@1.0",
                     "copyright": "NOASSERTION"
                 }
             },
             "components": [{
-                "bom-ref": f"pkg:huggingface/{model_id.replace('/', '/')}@1.0",
+                "bom-ref": f"pkg:huggingface/{model_id}@1.0",
                 "type": "machine-learning-model",
                 "name": model_id.split("/")[-1],
                 "version": "1.0",
-                "purl": f"pkg:huggingface/{model_id.replace('/', '/')}@1.0"
+                "purl": f"pkg:huggingface/{model_id}@1.0"
             }],
             "dependencies": [{
-                "ref": f"pkg:generic/{model_id.replace('/', '%2F')}@1.0",
-                "dependsOn": [f"pkg:huggingface/{model_id.replace('/', '/')}@1.0"]
+                "ref": f"pkg:generic/{_purl_model_id(model_id)}@1.0",
+                "dependsOn": [f"pkg:huggingface/{model_id}@1.0"]
             }]
         }
 
@@ -311,14 +412,14 @@ class AIBOMGenerator:
         aibom = {
             "bomFormat": "CycloneDX",
             "specVersion": "1.6",
-            "serialNumber": f"urn:uuid:{str(uuid.uuid4())}",
+            "serialNumber": f"urn:uuid:{_new_serial()}",
             "version": 1,
             "metadata": self._create_metadata_section(model_id, metadata),
             "components": [self._create_component_section(model_id, metadata)],
             "dependencies": [
                 {
-                    "ref": f"pkg:generic/{model_id.replace('/', '%2F')}@{version}",
-                    "dependsOn": [f"pkg:huggingface/{model_id.replace('/', '/')}@{version}"]
+                    "ref": f"pkg:generic/{_purl_model_id(model_id)}@{version}",
+                    "dependsOn": [f"pkg:huggingface/{model_id}@{version}"]
                 }
             ]
         }
@@ -473,15 +574,7 @@ class AIBOMGenerator:
         
         # Create tools section with components array
         tools = {
-            "components": [{
-                "bom-ref": "pkg:generic/owasp-genai/owasp-aibom-generator@1.0.0",
-                "type": "application",
-                "name": "OWASP AIBOM Generator",
-                "version": "1.0.0",
-                "manufacturer": {
-                    "name": "OWASP GenAI Security Project"
-                }
-            }]
+            "components": [_TOOLS_COMPONENT_TEMPLATE.copy()]
         }
 
 
@@ -494,12 +587,12 @@ class AIBOMGenerator:
 
         # Create component section for metadata
         component = {
-            "bom-ref": f"pkg:generic/{model_id.replace('/', '%2F')}@{version}",
+            "bom-ref": f"pkg:generic/{_purl_model_id(model_id)}@{version}",
             "type": "application",
             "name": metadata.get("name", model_id.split("/")[-1]),
             "description": metadata.get("description", f"AI model {model_id}"),
             "version": version,
-            "purl": f"pkg:generic/{model_id.replace('/', '%2F')}@{version}"
+            "purl": f"pkg:generic/{_purl_model_id(model_id)}@{version}"
         }
         
         # Add authors to component if available
@@ -509,12 +602,10 @@ class AIBOMGenerator:
         # Add publisher and supplier if author is available
         if "author" in metadata and metadata["author"]:
             component["publisher"] = metadata["author"]
-            component["supplier"] = {
-                "name": metadata["author"]
-            }
-            component["manufacturer"] = {
-                "name": metadata["author"]
-            }
+            # Share the org entity dict between supplier and manufacturer
+            org_entity = {"name": metadata["author"]}
+            component["supplier"] = org_entity
+            component["manufacturer"] = org_entity
             
         # Add copyright
         component["copyright"] = "NOASSERTION"
@@ -585,14 +676,14 @@ class AIBOMGenerator:
         version = metadata.get("commit", "1.0")
         
         # Create PURL with version information if commit is available
-        purl = f"pkg:huggingface/{model_id.replace('/', '/')}"
+        purl = f"pkg:huggingface/{model_id}"
         if "commit" in metadata:
             purl = f"{purl}@{metadata['commit']}"
         else:
             purl = f"{purl}@{version}"
             
         component = {
-            "bom-ref": f"pkg:huggingface/{model_id.replace('/', '/')}@{version}",
+            "bom-ref": f"pkg:huggingface/{model_id}@{version}",
             "type": "machine-learning-model",
             "group": group,
             "name": name,
@@ -602,11 +693,9 @@ class AIBOMGenerator:
 
         # Handle license
         license_value = None
-        if metadata and "licenses" in metadata and metadata["licenses"]:
-            license_value = metadata["licenses"]
-            print(f"✅ COMPONENT: Found licenses = {license_value}")
-        elif metadata and "license" in metadata and metadata["license"]:
-            license_value = metadata["license"]
+        if metadata:
+            license_value = metadata.get("licenses") or metadata.get("license")
+        if license_value:
             print(f"✅ COMPONENT: Found license = {license_value}")
 
         if license_value:
@@ -629,34 +718,18 @@ class AIBOMGenerator:
         # ALWAYS add description
         component["description"] = metadata.get("description", f"AI model {model_id}")
         
-        # Add enhanced technical properties to component 
-        technical_properties = [] 
-
-        # Add model type information 
-        if "model_type" in metadata: 
-            technical_properties.append({"name": "model_type", "value": str(metadata["model_type"])}) 
-            print(f"✅ COMPONENT: Added model_type = {metadata['model_type']}") 
-
-        # Add tokenizer information 
-        if "tokenizer_class" in metadata: 
-            technical_properties.append({"name": "tokenizer_class", "value": str(metadata["tokenizer_class"])}) 
-            print(f"✅ COMPONENT: Added tokenizer_class = {metadata['tokenizer_class']}") 
-
-        # Add architecture information 
-        if "architectures" in metadata: 
-            arch_value = metadata["architectures"] 
-            if isinstance(arch_value, list): 
-                arch_value = ", ".join(arch_value) 
-            technical_properties.append({"name": "architectures", "value": str(arch_value)}) 
-            print(f"✅ COMPONENT: Added architectures = {arch_value}") 
-
-        # Add library information 
-        if "library_name" in metadata: 
-            technical_properties.append({"name": "library_name", "value": str(metadata["library_name"])}) 
-            print(f"✅ COMPONENT: Added library_name = {metadata['library_name']}") 
-
-        # Add technical properties to component if any exist 
-        if technical_properties: 
+        # Add enhanced technical properties to component (table-driven)
+        technical_properties = []
+        for key in _TECH_PROP_FIELDS:
+            if key in metadata:
+                value = metadata[key]
+                if isinstance(value, list):
+                    value = ", ".join(value)
+                technical_properties.append({"name": key, "value": str(value)})
+                print(f"✅ COMPONENT: Added {key} = {value}")
+
+        # Add technical properties to component if any exist
+        if technical_properties:
             component["properties"] = technical_properties
 
         # Add external references
@@ -676,14 +749,14 @@ class AIBOMGenerator:
         if author_name and author_name != "unknown":
             component["authors"] = [{"name": author_name}]
             component["publisher"] = author_name
-            component["supplier"] = {
-                "name": author_name,
-                "url": [f"https://huggingface.co/{author_name}"]
-            }
-            component["manufacturer"] = {
+            # Supplier and manufacturer are the same org entity; share the
+            # dict since nothing downstream mutates it before serialization
+            org_entity = {
                 "name": author_name,
                 "url": [f"https://huggingface.co/{author_name}"]
             }
+            component["supplier"] = org_entity
+            component["manufacturer"] = org_entity
             
         # Add copyright
         component["copyright"] = "NOASSERTION"
@@ -693,12 +766,21 @@ class AIBOMGenerator:
 
         return component
 
+    @staticmethod
+    def _iter_eval_metrics(raw_results):
+        """Yield (metric_type, metric_value) pairs from EvalResult-like or dict entries."""
+        for res in raw_results:
+            if isinstance(res, dict):
+                yield res.get("metric_type"), res.get("metric_value")
+            else:
+                yield getattr(res, "metric_type", None), getattr(res, "metric_value", None)
+
     def _eval_results_to_json(self, eval_results: List[EvalResult]) -> List[Dict[str, str]]:
-        res = []
-        for eval_result in eval_results:
-            if hasattr(eval_result, "metric_type") and hasattr(eval_result, "metric_value"):
-                res.append({"type": eval_result.metric_type, "value": str(eval_result.metric_value)})
-        return res
+        return [
+            {"type": metric_type, "value": str(metric_value)}
+            for metric_type, metric_value in self._iter_eval_metrics(eval_results)
+            if metric_type is not None and metric_value is not None
+        ]
 
         
     def _create_model_card_section(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
@@ -718,42 +800,38 @@ class AIBOMGenerator:
         
         # Add properties section with enhanced extraction fields
         properties = []
-        
-        # Component-level fields that shouldn't be duplicated in model card
-        component_level_fields = ["name", "author", "license", "description", "commit"]
-        
+
         # DEBUG: troubleshooting AIBOM generation
-        print(f"🔍 DEBUG: About to iterate metadata.items()")
         print(f"🔍 DEBUG: metadata type = {type(metadata)}")
-        if isinstance(metadata, dict):
-            print(f"🔍 DEBUG: metadata keys = {list(metadata.keys())}")
-        else:
+        if not isinstance(metadata, dict):
             print(f"🔍 DEBUG: metadata value = {metadata}")
             print(f"🔍 DEBUG: This is the problem - metadata should be a dict!")
-                
-        # Add all enhanced extraction fields to model card properties
+
+        # Add all enhanced extraction fields to model card properties.
+        # Skip the walk entirely when metadata holds nothing beyond the
+        # component-level fields already emitted on the component itself.
         try:
-            for key, value in metadata.items():
-                if key not in component_level_fields and value is not None:
-                    # Handle different data types properly
-                    if isinstance(value, (list, dict)):
-                        if isinstance(value, list) and len(value) > 0:
-                            # Convert list to readable format
-                            if all(isinstance(item, str) for item in value):
-                                value = ", ".join(value)
-                            else:
+            if not _MODEL_CARD_COMPONENT_FIELDS.issuperset(metadata.keys()):
+                for key, value in metadata.items():
+                    if key not in _MODEL_CARD_COMPONENT_FIELDS and value is not None:
+                        # Handle different data types properly
+                        if isinstance(value, (list, dict)):
+                            if isinstance(value, list) and len(value) > 0:
+                                # Convert list to readable format
+                                if all(isinstance(item, str) for item in value):
+                                    value = ", ".join(value)
+                                else:
+                                    value = json.dumps(value)
+                            elif isinstance(value, dict):
                                 value = json.dumps(value)
-                        elif isinstance(value, dict):
-                            value = json.dumps(value)
-                    
-                    properties.append({"name": key, "value": str(value)})
-                    print(f"✅ MODEL_CARD: Added {key} = {value}")
+
+                        properties.append({"name": key, "value": str(value)})
         except AttributeError as e:
             print(f"❌ FOUND THE ERROR: {e}")
             print(f"❌ metadata type: {type(metadata)}")
             print(f"❌ metadata value: {metadata}")
             raise e
-        
+
         # Always include properties section (even if empty for consistency)
         model_card_section["properties"] = properties
         print(f"✅ MODEL_CARD: Added {len(properties)} properties to model card")
@@ -805,31 +883,30 @@ class AIBOMGenerator:
         
         # Add model parameters to model card section
         model_card_section["modelParameters"] = model_parameters
-        # Add enhanced technical parameters
-        if "model_type" in metadata or "tokenizer_class" in metadata or "architectures" in metadata:
+        # Add enhanced technical parameters only when any relevant key exists
+        if not _TECH_DETAIL_KEYS.isdisjoint(metadata.keys()):
             technical_details = {}
-            
+
             if "model_type" in metadata:
                 technical_details["modelType"] = metadata["model_type"]
-            
+
             if "tokenizer_class" in metadata:
                 technical_details["tokenizerClass"] = metadata["tokenizer_class"]
-                
+
             if "architectures" in metadata:
                 technical_details["architectures"] = metadata["architectures"]
-            
+
             # Add to model parameters
             model_parameters.update(technical_details)
             print(f"✅ MODEL_CARD: Added technical details: {list(technical_details.keys())}")
-        
+
         # Update model parameters with enhanced details
         model_card_section["modelParameters"] = model_parameters
-        
-        # Add considerations section
-        considerations = {}
-        for k in ["limitations", "ethical_considerations", "bias", "risks"]:
-            if k in metadata:
-                considerations[k] = metadata[k]
+
+        # Add considerations section only when a relevant key exists
+        considerations = {
+            k: metadata[k] for k in _CONSIDERATION_KEYS if k in metadata
+        }
         if considerations:
             model_card_section["considerations"] = considerations
 
@@ -837,22 +914,7 @@ class AIBOMGenerator:
         
     def _get_license_url(self, license_id: str) -> str:
         """Get the URL for a license based on its SPDX ID."""
-        license_urls = {
-            "apache-2.0": "https://www.apache.org/licenses/LICENSE-2.0",
-            "mit": "https://opensource.org/licenses/MIT",
-            "bsd-3-clause": "https://opensource.org/licenses/BSD-3-Clause",
-            "gpl-3.0": "https://www.gnu.org/licenses/gpl-3.0.en.html",
-            "cc-by-4.0": "https://creativecommons.org/licenses/by/4.0/",
-            "cc-by-sa-4.0": "https://creativecommons.org/licenses/by-sa/4.0/",
-            "cc-by-nc-4.0": "https://creativecommons.org/licenses/by-nc/4.0/",
-            "cc-by-nd-4.0": "https://creativecommons.org/licenses/by-nd/4.0/",
-            "cc-by-nc-sa-4.0": "https://creativecommons.org/licenses/by-nc-sa/4.0/",
-            "cc-by-nc-nd-4.0": "https://creativecommons.org/licenses/by-nc-nd/4.0/",
-            "lgpl-3.0": "https://www.gnu.org/licenses/lgpl-3.0.en.html",
-            "mpl-2.0": "https://www.mozilla.org/en-US/MPL/2.0/",
-        }
-        
-        return license_urls.get(license_id.lower(), "https://spdx.org/licenses/" )
+        return _LICENSE_URLS.get(license_id.lower(), "https://spdx.org/licenses/" )
 
     def _fetch_with_retry(self, fetch_func, *args, max_retries=3, **kwargs):
         """Fetch data with retry logic for network failures."""
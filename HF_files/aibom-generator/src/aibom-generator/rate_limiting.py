@@ -1,114 +1,299 @@
+import os
 import time
 from collections import defaultdict
-from fastapi import Request
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
 import logging
 import asyncio  # Concurrency limiting
 
+try:
+    import redis.asyncio as redis_asyncio
+    REDIS_AVAILABLE = True
+except ImportError:
+    redis_asyncio = None
+    REDIS_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+# Atomic sliding-window check-and-increment; one round-trip per request and
+# correct across workers because the decision happens inside Redis
+_RATE_LIMIT_LUA = """
+local key = KEYS[1]
+local window = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+if redis.call('ZCARD', key) >= limit then
+    return 0
+end
+redis.call('ZADD', key, now, tostring(now) .. '-' .. tostring(math.random()))
+redis.call('EXPIRE', key, window)
+return 1
+"""
+
+# Pre-encoded rejection payloads
+_RATE_LIMITED_BODY = b'{"detail": "Rate limit exceeded. Please try again later."}'
+_AT_CAPACITY_BODY = b'{"detail": "Server is at capacity. Please try again later."}'
+
+
+async def _send_json(send, status_code, body: bytes):
+    """Emit a small JSON rejection response directly via ASGI messages."""
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+class RateLimitMiddleware:
+    """Pure ASGI middleware: avoids BaseHTTPMiddleware's per-request task
+    group and Request construction on every call."""
+
     def __init__(
-        self, 
-        app, 
+        self,
+        app,
         rate_limit_per_minute=10,
         rate_limit_window=60,
         protected_routes=["/generate", "/api/generate", "/api/generate-with-report"]
     ):
-        super().__init__(app)
+        self.app = app
         self.rate_limit_per_minute = rate_limit_per_minute
         self.rate_limit_window = rate_limit_window
         self.protected_routes = protected_routes
-        self.ip_requests = defaultdict(list)
+        # str.startswith accepts a tuple and runs the scan in C
+        self._protected_tuple = tuple(sorted(protected_routes, key=len, reverse=True))
+        # Two-bucket sliding window: [bucket_index, count_current, count_previous]
+        # per IP - constant memory instead of one timestamp per request
+        self.ip_buckets = defaultdict(lambda: [0, 0, 0])
+        # Hard ceiling on tracked IPs; stale entries are evicted lazily only
+        # when the ceiling is hit, never as a per-request scan
+        self.max_tracked_ips = 100_000
+        # Optional shared backend: with multiple workers the in-process
+        # buckets allow workers x limit, so use Redis when configured
+        redis_url = os.environ.get("REDIS_URL")
+        if REDIS_AVAILABLE and redis_url:
+            self.redis = redis_asyncio.from_url(redis_url)
+            logger.info("Rate limit middleware using Redis backend")
+        else:
+            self.redis = None
         logger.info(f"Rate limit middleware initialized: {rate_limit_per_minute} requests per {rate_limit_window}s")
+
+    async def _check_redis(self, client_ip):
+        """Atomic check-and-increment in Redis.
+
+        Returns True (allowed), False (limited), or None on backend error,
+        in which case the caller falls back to the in-process window.
+        """
+        try:
+            allowed = await self.redis.eval(
+                _RATE_LIMIT_LUA, 1, f"rl:{client_ip}",
+                self.rate_limit_window, self.rate_limit_per_minute, time.time()
+            )
+            return bool(int(allowed))
+        except Exception as e:
+            logger.warning(f"Redis rate limiting failed ({e}); falling back to in-process window")
+            return None
+
+    def _evict_stale(self, current_bucket):
+        """Drop IPs whose counts can no longer affect a rate decision."""
+        stale = [
+            ip for ip, entry in self.ip_buckets.items()
+            if entry[0] < current_bucket - 1
+        ]
+        for ip in stale:
+            del self.ip_buckets[ip]
+        # Still over the cap (e.g. a spoofed-IP flood inside one window):
+        # drop arbitrary entries to honour the memory ceiling
+        while len(self.ip_buckets) > self.max_tracked_ips:
+            self.ip_buckets.pop(next(iter(self.ip_buckets)))
         
-    async def dispatch(self, request: Request, call_next):
-        client_ip = request.client.host
-        current_time = time.time()
-        
-        # Only apply rate limiting to protected routes
-        if any(request.url.path.startswith(route) for route in self.protected_routes):
-            # Clean up old requests
-            self.ip_requests[client_ip] = [t for t in self.ip_requests[client_ip] 
-                                          if current_time - t < self.rate_limit_window]
-            
-            # Check if rate limit exceeded
-            if len(self.ip_requests[client_ip]) >= self.rate_limit_per_minute:
-                logger.warning(f"Rate limit exceeded for IP {client_ip} on {request.url.path}")
-                return JSONResponse(
-                    status_code=429,
-                    content={"detail": "Rate limit exceeded. Please try again later."}
-                )
-            
-            # Add current request timestamp
-            self.ip_requests[client_ip].append(current_time)
-        
-        # Process the request
-        response = await call_next(request)
-        return response
+    async def _allow(self, client_ip):
+        """Decide whether this arrival fits the rate window and count it."""
+        if self.redis is not None:
+            verdict = await self._check_redis(client_ip)
+            if verdict is not None:
+                return verdict
+            # verdict is None: backend error, use the in-process window
+
+        # Monotonic clock: immune to NTP steps / wall-clock jumps that
+        # would skew the window; read once per request
+        current_time = time.monotonic()
+        window = self.rate_limit_window
+        bucket = int(current_time // window)
+        if len(self.ip_buckets) > self.max_tracked_ips:
+            self._evict_stale(bucket)
+        entry = self.ip_buckets[client_ip]
+        if entry[0] != bucket:
+            # Shift: previous window count only carries over from the
+            # immediately preceding bucket
+            entry[2] = entry[1] if entry[0] == bucket - 1 else 0
+            entry[1] = 0
+            entry[0] = bucket
+
+        # Weight the previous bucket by how much of it still overlaps
+        # the sliding window
+        frac = (current_time % window) / window
+        effective = entry[2] * (1.0 - frac) + entry[1]
+
+        # Check if rate limit exceeded
+        if effective >= self.rate_limit_per_minute:
+            return False
+
+        # Count the current request
+        entry[1] += 1
+        return True
+
+    async def __call__(self, scope, receive, send):
+        # Only apply rate limiting to protected HTTP routes
+        if scope["type"] != "http" or not scope["path"].startswith(self._protected_tuple):
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+
+        if not await self._allow(client_ip):
+            logger.warning(f"Rate limit exceeded for IP {client_ip} on {scope['path']}")
+            await _send_json(send, 429, _RATE_LIMITED_BODY)
+            return
+
+        await self.app(scope, receive, send)
+
+class ConcurrencyLimitMiddleware:
+    """Pure ASGI middleware: semaphore gate without BaseHTTPMiddleware's
+    per-request overhead."""
 
-class ConcurrencyLimitMiddleware(BaseHTTPMiddleware):
     def __init__(
-        self, 
-        app, 
+        self,
+        app,
         max_concurrent_requests=5,
         timeout=5.0,
         protected_routes=None
     ):
-        super().__init__(app)
+        self.app = app
         self.semaphore = asyncio.Semaphore(max_concurrent_requests)
         self.timeout = timeout
         self.protected_routes = protected_routes or ["/generate", "/api/generate", "/api/generate-with-report"]
+        self._protected_tuple = tuple(sorted(self.protected_routes, key=len, reverse=True))
         logger.info(f"Concurrency limit middleware initialized: {max_concurrent_requests} concurrent requests")
-        
-    async def dispatch(self, request, call_next):
+
+    async def __call__(self, scope, receive, send):
+        # Only apply to protected HTTP routes
+        if scope["type"] != "http" or not scope["path"].startswith(self._protected_tuple):
+            await self.app(scope, receive, send)
+            return
+
         try:
-            # Only apply to protected routes
-            if any(request.url.path.startswith(route) for route in self.protected_routes):
-                try:
-                    # Try to acquire the semaphore
-                    acquired = False
-                    try:
-                        # Use wait_for instead of timeout context manager for compatibility
-                        await asyncio.wait_for(self.semaphore.acquire(), timeout=self.timeout)
-                        acquired = True
-                        return await call_next(request)
-                    finally:
-                        if acquired:
-                            self.semaphore.release()
-                except asyncio.TimeoutError:
-                    # Timeout waiting for semaphore
-                    logger.warning(f"Concurrency limit reached for {request.url.path}")
-                    return JSONResponse(
-                        status_code=503, 
-                        content={"detail": "Server is at capacity. Please try again later."}
-                    )
-            else:
-                # For non-protected routes, proceed normally
-                return await call_next(request)
-        except Exception as e:
-            logger.error(f"Error in ConcurrencyLimitMiddleware: {str(e)}")
-            return JSONResponse(
-                status_code=500,
-                content={"detail": f"Internal server error in middleware: {str(e)}"}
-            )
+            # Use wait_for instead of timeout context manager for compatibility
+            await asyncio.wait_for(self.semaphore.acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            # Timeout waiting for semaphore
+            logger.warning(f"Concurrency limit reached for {scope['path']}")
+            await _send_json(send, 503, _AT_CAPACITY_BODY)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.semaphore.release()
 
 
 # Protection against large request payloads
-class RequestSizeLimitMiddleware(BaseHTTPMiddleware):
+class RequestSizeLimitMiddleware:
+    """Pure ASGI middleware: BaseHTTPMiddleware would build a Request and
+    Headers wrapper per call just to read one header."""
+
     def __init__(self, app, max_content_length=1024*1024):  # 1MB default
-        super().__init__(app)
+        self.app = app
         self.max_content_length = max_content_length
         logger.info(f"Request size limit middleware initialized: {max_content_length} bytes")
-        
-    async def dispatch(self, request: Request, call_next):
-        content_length = request.headers.get('content-length')
-        if content_length:
-            if int(content_length) > self.max_content_length:
-                logger.warning(f"Request too large: {content_length} bytes")
-                return JSONResponse(
-                    status_code=413,
-                    content={"detail": "Request too large"}
-                )
-        return await call_next(request)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            for name, value in scope["headers"]:
+                if name == b"content-length":
+                    try:
+                        too_large = int(value) > self.max_content_length
+                    except ValueError:
+                        too_large = False
+                    if too_large:
+                        logger.warning(f"Request too large: {value.decode('latin-1')} bytes")
+                        await _send_json(send, 413, b'{"detail": "Request too large"}')
+                        return
+                    break
+        await self.app(scope, receive, send)
+
+
+class ApiGuardMiddleware(RateLimitMiddleware):
+    """Fused size -> rate -> concurrency guard.
+
+    Stacking the three middlewares cost three coroutine frames and three
+    route matches per request; this runs all checks inline in one pass.
+    """
+
+    def __init__(
+        self,
+        app,
+        max_content_length=1024*1024,  # 1MB default
+        rate_limit_per_minute=10,
+        rate_limit_window=60,
+        max_concurrent_requests=5,
+        timeout=5.0,
+        protected_routes=None
+    ):
+        super().__init__(
+            app,
+            rate_limit_per_minute=rate_limit_per_minute,
+            rate_limit_window=rate_limit_window,
+            protected_routes=protected_routes or ["/generate", "/api/generate", "/api/generate-with-report"]
+        )
+        self.max_content_length = max_content_length
+        self.semaphore = asyncio.Semaphore(max_concurrent_requests)
+        self.timeout = timeout
+        logger.info(f"API guard middleware initialized: {max_content_length} byte limit, {max_concurrent_requests} concurrent requests")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # (1) Size check applies to every HTTP request
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    too_large = int(value) > self.max_content_length
+                except ValueError:
+                    too_large = False
+                if too_large:
+                    logger.warning(f"Request too large: {value.decode('latin-1')} bytes")
+                    await _send_json(send, 413, b'{"detail": "Request too large"}')
+                    return
+                break
+
+        # (2) Route match happens once for both remaining checks
+        if not scope["path"].startswith(self._protected_tuple):
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+
+        # (3) Rate check
+        if not await self._allow(client_ip):
+            logger.warning(f"Rate limit exceeded for IP {client_ip} on {scope['path']}")
+            await _send_json(send, 429, _RATE_LIMITED_BODY)
+            return
+
+        # (4) Concurrency gate
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Concurrency limit reached for {scope['path']}")
+            await _send_json(send, 503, _AT_CAPACITY_BODY)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.semaphore.release()
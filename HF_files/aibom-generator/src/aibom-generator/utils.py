@@ -6,7 +6,9 @@ import json
 import logging
 import os
 import re
+import threading
 import uuid
+from functools import lru_cache
 from typing import Dict, List, Optional, Any, Union, Tuple
 from enum import Enum
 from .field_registry_manager import (
@@ -20,6 +22,9 @@ from .field_registry_manager import (
 
 logger = logging.getLogger(__name__)
 
+# Guards one-time initialization of the cached field detector
+_detector_init_lock = threading.Lock()
+
 # Validation severity levels
 class ValidationSeverity(Enum):
     ERROR = "error"
@@ -163,8 +168,13 @@ def generate_uuid():
     return str(uuid.uuid4())
 
 
-def normalize_license_id(license_text):
-    license_mappings = {
+# Patterns compiled once at import; re's internal cache still pays a dict
+# lookup per call on the hot scoring path
+_LICENSE_SCRUB_RE = re.compile(r'[^\w\s-]')
+_HF_PURL_RE = re.compile(r'^pkg:huggingface/.+')
+
+# Built once at import; keys are already lowercase so lookups stay O(1)
+_LICENSE_MAPPINGS = {
         "mit": "MIT",
         "apache": "Apache-2.0",
         "apache 2": "Apache-2.0",
@@ -203,30 +213,37 @@ def normalize_license_id(license_text):
         "commercial": "NONE",
     }
 
+
+@lru_cache(maxsize=1024)
+def normalize_license_id(license_text):
     if not license_text:
         return None
 
-    normalized = re.sub(r'[^\w\s-]', '', license_text.lower())
+    normalized = _LICENSE_SCRUB_RE.sub('', license_text.lower())
 
-    if normalized in license_mappings:
-        return license_mappings[normalized]
+    if normalized in _LICENSE_MAPPINGS:
+        return _LICENSE_MAPPINGS[normalized]
 
-    for key, value in license_mappings.items():
+    for key, value in _LICENSE_MAPPINGS.items():
         if key in normalized:
             return value
 
     return license_text
 
 
+_SPDX_LICENSES = frozenset({
+    "MIT", "Apache-2.0", "GPL-3.0-only", "GPL-2.0-only", "LGPL-3.0-only",
+    "BSD-3-Clause", "BSD-2-Clause", "CC-BY-4.0", "CC-BY-SA-4.0", "CC0-1.0",
+    "Unlicense", "NONE"
+})
+
+
 def validate_spdx(license_entry):
-    spdx_licenses = [
-        "MIT", "Apache-2.0", "GPL-3.0-only", "GPL-2.0-only", "LGPL-3.0-only",
-        "BSD-3-Clause", "BSD-2-Clause", "CC-BY-4.0", "CC-BY-SA-4.0", "CC0-1.0",
-        "Unlicense", "NONE"
-    ]
+    # Entries may be CycloneDX license dicts ({"license": {"id": ...}}) rather
+    # than bare id strings; only strings can be valid SPDX ids here
     if isinstance(license_entry, list):
-        return all(lic in spdx_licenses for lic in license_entry)
-    return license_entry in spdx_licenses
+        return all(isinstance(lic, str) and lic in _SPDX_LICENSES for lic in license_entry)
+    return isinstance(license_entry, str) and license_entry in _SPDX_LICENSES
 
 
 def check_field_in_aibom(aibom: Dict[str, Any], field: str) -> bool:
@@ -857,35 +874,39 @@ def check_field_with_enhanced_results(aibom: Dict[str, Any], field: str, extract
         True if the field is present and should count toward score, False otherwise
     """
     try:
-        # Initialize dynamic field detector (cached)
+        # Initialize dynamic field detector (cached). Fast path is a single
+        # unlocked attribute read; the lock only guards first-time init so
+        # concurrent requests don't build the detector twice
         if not hasattr(check_field_with_enhanced_results, '_detector'):
-            try:
-                if REGISTRY_AVAILABLE:
-                    # Use the consolidated registry manager
-                    registry_manager = get_field_registry_manager()
-                    check_field_with_enhanced_results._detector = DynamicFieldDetector(registry_manager)
-                    print(f"✅ Dynamic field detector initialized with registry manager")
-                else:
-                    # Create registry manager from path
-                    from field_registry_manager import FieldRegistryManager
-                    registry_path = os.path.join(current_dir, "field_registry.json")
-                    registry_manager = FieldRegistryManager(registry_path)
-                    check_field_with_enhanced_results._detector = DynamicFieldDetector(registry_manager)
-                    print(f"✅ Dynamic field detector initialized with fallback registry manager")
-                    
-            except Exception as e:
-                print(f"❌ Failed to initialize dynamic field detector: {e}")
-                # Final fallback
-                import os
-                current_dir = os.path.dirname(os.path.abspath(__file__))
-                registry_path = os.path.join(current_dir, "field_registry.json")
-                try:
-                    check_field_with_enhanced_results._detector = DynamicFieldDetector(registry_path)
-                    print(f"🔄 Dynamic field detector initialized with emergency fallback")
-                except Exception as final_error:
-                    print(f"❌ Complete failure to initialize dynamic field detector: {final_error}")
-                    check_field_with_enhanced_results._detector = None
-        
+            with _detector_init_lock:
+                if not hasattr(check_field_with_enhanced_results, '_detector'):
+                    try:
+                        if REGISTRY_AVAILABLE:
+                            # Use the consolidated registry manager
+                            registry_manager = get_field_registry_manager()
+                            check_field_with_enhanced_results._detector = DynamicFieldDetector(registry_manager)
+                            print(f"✅ Dynamic field detector initialized with registry manager")
+                        else:
+                            # Create registry manager from path
+                            from field_registry_manager import FieldRegistryManager
+                            registry_path = os.path.join(current_dir, "field_registry.json")
+                            registry_manager = FieldRegistryManager(registry_path)
+                            check_field_with_enhanced_results._detector = DynamicFieldDetector(registry_manager)
+                            print(f"✅ Dynamic field detector initialized with fallback registry manager")
+
+                    except Exception as e:
+                        print(f"❌ Failed to initialize dynamic field detector: {e}")
+                        # Final fallback
+                        import os
+                        current_dir = os.path.dirname(os.path.abspath(__file__))
+                        registry_path = os.path.join(current_dir, "field_registry.json")
+                        try:
+                            check_field_with_enhanced_results._detector = DynamicFieldDetector(registry_path)
+                            print(f"🔄 Dynamic field detector initialized with emergency fallback")
+                        except Exception as final_error:
+                            print(f"❌ Complete failure to initialize dynamic field detector: {final_error}")
+                            check_field_with_enhanced_results._detector = None
+
         detector = check_field_with_enhanced_results._detector
         
         if detector is None:
@@ -1160,33 +1181,34 @@ def calculate_industry_neutral_score(aibom: Dict[str, Any], extraction_results:
     return result
 
 
-def calculate_completeness_score(aibom: Dict[str, Any], validate: bool = True, use_best_practices: bool = True, extraction_results: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+def calculate_completeness_score(aibom: Dict[str, Any], validate: bool = True, use_best_practices: bool = True, extraction_results: Optional[Dict[str, Any]] = None, validation_result: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Calculate completeness score for an AIBOM and optionally validate against AI requirements.
     Enhanced with industry best practices scoring.
-    
+
     Args:
         aibom: The AIBOM to score and validate
         validate: Whether to perform validation
         use_best_practices: Whether to use enhanced industry best practices scoring
-        
+        validation_result: Optional pre-computed result from validate_aibom; when
+            provided the scorer reuses it instead of re-validating the AIBOM
+
     Returns:
         Dictionary containing score and validation results
     """
     print(f"🔍 DEBUG: use_best_practices={use_best_practices}")
     print(f"🔍 DEBUG: extraction_results is None: {extraction_results is None}")
     print(f"🔍 DEBUG: extraction_results keys: {list(extraction_results.keys()) if extraction_results else 'None'}")
-    
-    if use_best_practices:
-        print("🔍 DEBUG: Calling calculate_industry_neutral_score")
-        result = calculate_industry_neutral_score(aibom, extraction_results)
+
     # If using best practices scoring, use the enhanced industry-neutral approach
     if use_best_practices:
+        print("🔍 DEBUG: Calling calculate_industry_neutral_score")
         result = calculate_industry_neutral_score(aibom, extraction_results)
-        
+
         # Add validation if requested
         if validate:
-            validation_result = validate_aibom(aibom)
+            if validation_result is None:
+                validation_result = validate_aibom(aibom)
             result["validation"] = validation_result
             
             # Adjust score based on validation results
@@ -1247,13 +1269,13 @@ def calculate_completeness_score(aibom: Dict[str, Any], validate: bool = True, u
             2 if comp.get("type") else 0,
             4 if comp.get("name") else 0,
             2 if comp.get("bom-ref") else 0,
-            4 if comp.get("purl") and re.match(r'^pkg:huggingface/.+', comp["purl"]) else 0,
+            4 if comp.get("purl") and _HF_PURL_RE.match(comp["purl"]) else 0,
             4 if comp.get("description") and len(comp["description"]) > 20 else 0,
             4 if comp.get("licenses") and validate_spdx(comp["licenses"]) else 0
         ])
         for field in comp_fields:
             field_checklist[f"component.{field}"] = "✔" if comp.get(field) else "✘"
-            if field == "purl" and comp.get(field) and not re.match(r'^pkg:huggingface/.+', comp["purl"]):
+            if field == "purl" and comp.get(field) and not _HF_PURL_RE.match(comp["purl"]):
                 field_checklist[f"component.{field}"] = "✘"
             if field == "description" and comp.get(field) and len(comp["description"]) <= 20:
                 field_checklist[f"component.{field}"] = "✘"
@@ -1354,9 +1376,10 @@ def calculate_completeness_score(aibom: Dict[str, Any], validate: bool = True, u
     
     # Add validation if requested
     if validate:
-        validation_result = validate_aibom(aibom)
+        if validation_result is None:
+            validation_result = validate_aibom(aibom)
         result["validation"] = validation_result
-        
+
         # Adjust score based on validation results
         if not validation_result["valid"]:
             # Count errors and warnings
@@ -1406,59 +1429,60 @@ def create_purl(model_id: str) -> str:
     return f"pkg:huggingface/{parts['name']}"
 
 
+# Field definitions for display categorization; built once at import so
+# every report render doesn't reconstruct the two dicts
+_STANDARD_CYCLONEDX_FIELD_DEFS = {
+    "bomFormat": {"json_path": "bomFormat", "importance": "Critical"},
+    "specVersion": {"json_path": "specVersion", "importance": "Critical"},
+    "serialNumber": {"json_path": "serialNumber", "importance": "Critical"},
+    "version": {"json_path": "version", "importance": "Critical"},
+    "metadata.timestamp": {"json_path": "metadata.timestamp", "importance": "Important"},
+    "metadata.tools": {"json_path": "metadata.tools", "importance": "Important"},
+    "metadata.component": {"json_path": "metadata.component", "importance": "Important"},
+    "component.type": {"json_path": "components[].type", "importance": "Important"},
+    "component.name": {"json_path": "components[].name", "importance": "Critical"},
+    "component.bom-ref": {"json_path": "components[].bom-ref", "importance": "Important"},
+    "component.purl": {"json_path": "components[].purl", "importance": "Important"},
+    "component.description": {"json_path": "components[].description", "importance": "Important"},
+    "component.licenses": {"json_path": "components[].licenses", "importance": "Important"},
+    "externalReferences": {"json_path": "components[].externalReferences", "importance": "Supplementary"},
+    "downloadLocation": {"json_path": "components[].externalReferences[].url", "importance": "Critical"},
+}
+
+_AI_SPECIFIC_FIELD_DEFS = {
+    # Model card structure fields
+    "modelCard.modelParameters": {"json_path": "components[].modelCard.modelParameters", "importance": "Important"},
+    "modelCard.quantitativeAnalysis": {"json_path": "components[].modelCard.quantitativeAnalysis", "importance": "Important"},
+    "modelCard.considerations": {"json_path": "components[].modelCard.considerations", "importance": "Important"},
+    
+    # Properties-based fields
+    "primaryPurpose": {"json_path": "metadata.properties[].name=\"primaryPurpose\"", "importance": "Critical"},
+    "suppliedBy": {"json_path": "metadata.properties[].name=\"suppliedBy\"", "importance": "Critical"},
+    "typeOfModel": {"json_path": "components[].modelCard.properties[].name=\"typeOfModel\"", "importance": "Important"},
+    "energyConsumption": {"json_path": "components[].modelCard.properties[].name=\"energyConsumption\"", "importance": "Important"},
+    "hyperparameter": {"json_path": "components[].modelCard.properties[].name=\"hyperparameter\"", "importance": "Important"},
+    "limitation": {"json_path": "components[].modelCard.properties[].name=\"limitation\"", "importance": "Important"},
+    "safetyRiskAssessment": {"json_path": "components[].modelCard.properties[].name=\"safetyRiskAssessment\"", "importance": "Important"},
+    "modelExplainability": {"json_path": "components[].modelCard.properties[].name=\"modelExplainability\"", "importance": "Supplementary"},
+    "standardCompliance": {"json_path": "components[].modelCard.properties[].name=\"standardCompliance\"", "importance": "Supplementary"},
+    "domain": {"json_path": "components[].modelCard.properties[].name=\"domain\"", "importance": "Supplementary"},
+    "energyQuantity": {"json_path": "components[].modelCard.properties[].name=\"energyQuantity\"", "importance": "Supplementary"},
+    "energyUnit": {"json_path": "components[].modelCard.properties[].name=\"energyUnit\"", "importance": "Supplementary"},
+    "informationAboutTraining": {"json_path": "components[].modelCard.properties[].name=\"informationAboutTraining\"", "importance": "Supplementary"},
+    "informationAboutApplication": {"json_path": "components[].modelCard.properties[].name=\"informationAboutApplication\"", "importance": "Supplementary"},
+    "metric": {"json_path": "components[].modelCard.properties[].name=\"metric\"", "importance": "Supplementary"},
+    "metricDecisionThreshold": {"json_path": "components[].modelCard.properties[].name=\"metricDecisionThreshold\"", "importance": "Supplementary"},
+    "modelDataPreprocessing": {"json_path": "components[].modelCard.properties[].name=\"modelDataPreprocessing\"", "importance": "Supplementary"},
+    "autonomyType": {"json_path": "components[].modelCard.properties[].name=\"autonomyType\"", "importance": "Supplementary"},
+    "useSensitivePersonalInformation": {"json_path": "components[].modelCard.properties[].name=\"useSensitivePersonalInformation\"", "importance": "Supplementary"},
+}
+
+
 def get_field_categorization_for_display(aibom: Dict[str, Any]) -> Dict[str, Any]:
     """
     Hardcoded field categorization with dynamic status detection.
     """
-    
-    # Standard CycloneDX Fields
-    standard_cyclonedx_definitions = {
-        "bomFormat": {"json_path": "bomFormat", "importance": "Critical"},
-        "specVersion": {"json_path": "specVersion", "importance": "Critical"},
-        "serialNumber": {"json_path": "serialNumber", "importance": "Critical"},
-        "version": {"json_path": "version", "importance": "Critical"},
-        "metadata.timestamp": {"json_path": "metadata.timestamp", "importance": "Important"},
-        "metadata.tools": {"json_path": "metadata.tools", "importance": "Important"},
-        "metadata.component": {"json_path": "metadata.component", "importance": "Important"},
-        "component.type": {"json_path": "components[].type", "importance": "Important"},
-        "component.name": {"json_path": "components[].name", "importance": "Critical"},
-        "component.bom-ref": {"json_path": "components[].bom-ref", "importance": "Important"},
-        "component.purl": {"json_path": "components[].purl", "importance": "Important"},
-        "component.description": {"json_path": "components[].description", "importance": "Important"},
-        "component.licenses": {"json_path": "components[].licenses", "importance": "Important"},
-        "externalReferences": {"json_path": "components[].externalReferences", "importance": "Supplementary"},
-        "downloadLocation": {"json_path": "components[].externalReferences[].url", "importance": "Critical"},
-    }
-    
-    # AI-Specific Extension Fields  
-    ai_specific_definitions = {
-        # Model card structure fields
-        "modelCard.modelParameters": {"json_path": "components[].modelCard.modelParameters", "importance": "Important"},
-        "modelCard.quantitativeAnalysis": {"json_path": "components[].modelCard.quantitativeAnalysis", "importance": "Important"},
-        "modelCard.considerations": {"json_path": "components[].modelCard.considerations", "importance": "Important"},
-        
-        # Properties-based fields
-        "primaryPurpose": {"json_path": "metadata.properties[].name=\"primaryPurpose\"", "importance": "Critical"},
-        "suppliedBy": {"json_path": "metadata.properties[].name=\"suppliedBy\"", "importance": "Critical"},
-        "typeOfModel": {"json_path": "components[].modelCard.properties[].name=\"typeOfModel\"", "importance": "Important"},
-        "energyConsumption": {"json_path": "components[].modelCard.properties[].name=\"energyConsumption\"", "importance": "Important"},
-        "hyperparameter": {"json_path": "components[].modelCard.properties[].name=\"hyperparameter\"", "importance": "Important"},
-        "limitation": {"json_path": "components[].modelCard.properties[].name=\"limitation\"", "importance": "Important"},
-        "safetyRiskAssessment": {"json_path": "components[].modelCard.properties[].name=\"safetyRiskAssessment\"", "importance": "Important"},
-        "modelExplainability": {"json_path": "components[].modelCard.properties[].name=\"modelExplainability\"", "importance": "Supplementary"},
-        "standardCompliance": {"json_path": "components[].modelCard.properties[].name=\"standardCompliance\"", "importance": "Supplementary"},
-        "domain": {"json_path": "components[].modelCard.properties[].name=\"domain\"", "importance": "Supplementary"},
-        "energyQuantity": {"json_path": "components[].modelCard.properties[].name=\"energyQuantity\"", "importance": "Supplementary"},
-        "energyUnit": {"json_path": "components[].modelCard.properties[].name=\"energyUnit\"", "importance": "Supplementary"},
-        "informationAboutTraining": {"json_path": "components[].modelCard.properties[].name=\"informationAboutTraining\"", "importance": "Supplementary"},
-        "informationAboutApplication": {"json_path": "components[].modelCard.properties[].name=\"informationAboutApplication\"", "importance": "Supplementary"},
-        "metric": {"json_path": "components[].modelCard.properties[].name=\"metric\"", "importance": "Supplementary"},
-        "metricDecisionThreshold": {"json_path": "components[].modelCard.properties[].name=\"metricDecisionThreshold\"", "importance": "Supplementary"},
-        "modelDataPreprocessing": {"json_path": "components[].modelCard.properties[].name=\"modelDataPreprocessing\"", "importance": "Supplementary"},
-        "autonomyType": {"json_path": "components[].modelCard.properties[].name=\"autonomyType\"", "importance": "Supplementary"},
-        "useSensitivePersonalInformation": {"json_path": "components[].modelCard.properties[].name=\"useSensitivePersonalInformation\"", "importance": "Supplementary"},
-    }
-    
+
     # DYNAMIC: Check status for each field
     def check_field_presence(field_key):
         """Simple field presence detection"""
@@ -1543,7 +1567,7 @@ def get_field_categorization_for_display(aibom: Dict[str, Any]) -> Dict[str, Any
     
     # Build result with dynamic status
     standard_fields = {}
-    for field_key, field_info in standard_cyclonedx_definitions.items():
+    for field_key, field_info in _STANDARD_CYCLONEDX_FIELD_DEFS.items():
         standard_fields[field_key] = {
             "status": "✔" if check_field_presence(field_key) else "✘",
             "field_name": field_key,
@@ -1552,7 +1576,7 @@ def get_field_categorization_for_display(aibom: Dict[str, Any]) -> Dict[str, Any
         }
     
     ai_fields = {}
-    for field_key, field_info in ai_specific_definitions.items():
+    for field_key, field_info in _AI_SPECIFIC_FIELD_DEFS.items():
         ai_fields[field_key] = {
             "status": "✔" if check_field_presence(field_key) else "✘",
             "field_name": field_key,